@@ -2,6 +2,8 @@ import pygame
 import random
 import numpy as np
 import math
+import json
+from Food_Crusher_Audio import AudioMixer, ChannelPool
 
 # Initialize Pygame
 pygame.init()
@@ -28,16 +30,54 @@ CANDY_IMAGES = [
 
 swap_or_fall_occurred = False  # Track if a swap or fall happened
 
+# Audio: sounds are decoded once and played on a reserved, fixed set of channels
+AUDIO_CHANNELS = 8
+PITCH_STEPS = 4  # Match sound variants, one per cascade depth
+PITCH_STEP_SEMITONES = 2
+
+
+def pitch_variants(sound, steps):
+    """ Pre-render pitch-stepped copies of a sound by resampling its samples. """
+    samples = pygame.sndarray.array(sound)
+    variants = [sound]
+    for step in range(1, steps):
+        ratio = 2 ** (step * PITCH_STEP_SEMITONES / 12)
+        index = np.arange(0, len(samples), ratio).astype(int)
+        variants.append(pygame.sndarray.make_sound(np.ascontiguousarray(samples[index])))
+    return variants
+
+
 # Load sounds
 swap_sound = pygame.mixer.Sound('swap_sound.wav')
 match_sound = pygame.mixer.Sound('match_sound.wav')
 
+pygame.mixer.set_reserved(AUDIO_CHANNELS)
+channel_pool = ChannelPool([pygame.mixer.Channel(i) for i in range(AUDIO_CHANNELS)], pygame.mixer.Channel.get_busy)
+audio = AudioMixer({'swap': [swap_sound], 'match': pitch_variants(match_sound, PITCH_STEPS)},
+                   lambda sound: channel_pool.next().play(sound))
+
 # Initialize screen
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Candy Crush")
 
+# Seed the RNG explicitly so a game can be replayed from its seed and move list
+seed = random.randrange(2 ** 32)
+random.seed(seed)
+moves = []
+
+# When set, animation frames are passed to frame_sink(screen) instead of being shown
+frame_sink = None
+# When False, animations are skipped entirely and only the game state advances
+render_frames = True
+
+
+def new_grid():
+    """ Fill a new grid with random candies. """
+    return [[random.choice(range(len(CANDY_IMAGES))) for _ in range(COLS)] for _ in range(ROWS)]
+
+
 # Define grid
-grid = [[random.choice(range(len(CANDY_IMAGES))) for _ in range(COLS)] for _ in range(ROWS)]
+grid = new_grid()
 
 # Selected candy
 selected = None
@@ -76,6 +116,27 @@ def draw_score():
     screen.blit(score_surface, (10, 10))
 
 
+def animation_steps(steps):
+    """ Frame indices for an animation, or none at all when render_frames is off. """
+    return range(steps if render_frames else 0)
+
+
+def present_frame(delay, rects=None):
+    """ Show an animation frame, or hand it to frame_sink when rendering offscreen. """
+    audio.flush()  # Start this frame's sounds, coalesced, on the audio thread
+
+    if frame_sink is not None:
+        frame_sink(screen)
+        return
+
+    if rects:
+        pygame.display.update(rects)
+    else:
+        pygame.display.flip()
+    pygame.time.delay(delay)
+    pygame.event.pump()  # Allow other events to be processed
+
+
 def swap(candy1, candy2):
     r1, c1 = candy1
     r2, c2 = candy2
@@ -84,8 +145,11 @@ def swap(candy1, candy2):
     return candy1, candy2
 
 
-def check_match(updated_positions):
-    """ Check for matches only involving the updated positions after a swap or fall. """
+def check_match(updated_positions, depth=0):
+    """ Check for matches only involving the updated positions after a swap or fall.
+
+    depth is the cascade step, used to pick a higher-pitched match sound.
+    """
     visited = set()
     matched = set()
 
@@ -115,7 +179,7 @@ def check_match(updated_positions):
                 matched.update(connected_candies)
 
     if matched:
-        match_sound.play()
+        audio.post('match', depth)
 
     return matched
 
@@ -167,7 +231,7 @@ def animate_simultaneous_explosion(all_pieces, duration=15):
 
         all_velocities.append(velocities)
 
-    for step in range(duration):
+    for step in animation_steps(duration):
         screen.fill(BACKGROUND_COLOR)
         draw_grid()
         draw_score()
@@ -182,9 +246,7 @@ def animate_simultaneous_explosion(all_pieces, duration=15):
                 piece.set_alpha(alpha)
                 screen.blit(piece, (x, y))
 
-        pygame.display.flip()
-        pygame.time.delay(10)
-        pygame.event.pump()  # Allow other events to be processed
+        present_frame(10)
 
 
 def split_candy_image(image, rows, cols):
@@ -219,7 +281,7 @@ def drop_candies(existing_fall_complete=False):
                     new_candies.append((candy_type, start_pos, end_pos, row, col))
 
         # Animate candies falling from offscreen with adjusted easing for smoother effect
-        for step in range(falling_steps):
+        for step in animation_steps(falling_steps):
             screen.fill(BACKGROUND_COLOR)
             draw_grid()  # Draw current grid state without new candies
             draw_score()
@@ -229,8 +291,7 @@ def drop_candies(existing_fall_complete=False):
                 intermediate_pos = start_pos + (end_pos - start_pos) * t
                 screen.blit(CANDY_IMAGES[candy], intermediate_pos)
 
-            pygame.display.flip()
-            pygame.time.delay(falling_speed)
+            present_frame(falling_speed)
 
         for candy, _, _, row, col in new_candies:
             grid[row][col] = candy
@@ -258,7 +319,7 @@ def ease_out_bounce2(t):
 
 def animate_swap(candy1, candy2):
     # Play swap sound
-    swap_sound.play()
+    audio.post('swap')
 
     r1, c1 = candy1
     r2, c2 = candy2
@@ -273,7 +334,7 @@ def animate_swap(candy1, candy2):
     grid[r1][c1] = None
     grid[r2][c2] = None
 
-    for i in range(15):
+    for i in animation_steps(15):
         screen.fill(BACKGROUND_COLOR)
         draw_grid()
         draw_score()
@@ -286,9 +347,8 @@ def animate_swap(candy1, candy2):
         screen.blit(CANDY_IMAGES[original_candy1], intermediate_pos1)
         screen.blit(CANDY_IMAGES[original_candy2], intermediate_pos2)
 
-        pygame.display.update([pygame.Rect(pos1[0], pos1[1], CANDY_SIZE, CANDY_SIZE),
-                               pygame.Rect(pos2[0], pos2[1], CANDY_SIZE, CANDY_SIZE)])  # Update only affected areas
-        pygame.time.delay(30)
+        present_frame(30, [pygame.Rect(pos1[0], pos1[1], CANDY_SIZE, CANDY_SIZE),
+                           pygame.Rect(pos2[0], pos2[1], CANDY_SIZE, CANDY_SIZE)])  # Update only affected areas
 
     # Finalize the swap
     grid[r1][c1] = original_candy2
@@ -314,7 +374,7 @@ def animate_falling():
                         updated_positions.append((row, col))
                         break
 
-    for step in range(falling_steps):
+    for step in animation_steps(falling_steps):
         screen.fill(BACKGROUND_COLOR)
         draw_grid()
         draw_score()
@@ -324,9 +384,7 @@ def animate_falling():
             intermediate_pos = start_pos + (end_pos - start_pos) * t
             screen.blit(CANDY_IMAGES[candy], intermediate_pos)
 
-        pygame.display.flip()
-        pygame.time.delay(falling_speed)
-        pygame.event.pump()  # Allow other events to be processed
+        present_frame(falling_speed)
 
     for candy, _, _, row, col in falling_candies:
         grid[row][col] = candy
@@ -345,6 +403,38 @@ def is_adjacent(candy1, candy2):
     return (abs(r1 - r2) == 1 and c1 == c2) or (abs(c1 - c2) == 1 and r1 == r2)
 
 
+def play_move(candy1, candy2):
+    """ Swap two adjacent candies and resolve all resulting matches and cascades. """
+    animate_swap(candy1, candy2)
+    updated_positions = [candy1, candy2]  # Track updated candies
+    matched = check_match(updated_positions)
+
+    if matched:
+        # Handle the matches, fall animation, and check for cascading matches
+        remove_matches(matched)
+        updated_positions = animate_falling()
+
+        # Check for cascading matches after falling (allow chained matches)
+        depth = 0
+        while True:
+            depth += 1
+            matched = check_match(updated_positions, depth)
+            if matched:
+                remove_matches(matched)
+                updated_positions = animate_falling()  # Get new updated positions
+            else:
+                break
+    else:
+        # Swap back if no match is found
+        animate_swap(candy1, candy2)  # Reverse the swap if no match is made
+
+
+def save_replay(path):
+    """ Write the seed and move list needed to replay this game. """
+    with open(path, 'w') as f:
+        json.dump({'seed': seed, 'moves': moves}, f)
+
+
 def handle_candy_selection(pos):
     global selected
     x, y = pos
@@ -352,26 +442,8 @@ def handle_candy_selection(pos):
 
     if selected:
         if is_adjacent(selected, (row, col)):  # Only allow swaps with adjacent cells
-            animate_swap(selected, (row, col))
-            updated_positions = [selected, (row, col)]  # Track updated candies
-            matched = check_match(updated_positions)
-
-            if matched:
-                # Handle the matches, fall animation, and check for cascading matches
-                remove_matches(matched)
-                updated_positions = animate_falling()
-
-                # Check for cascading matches after falling (allow chained matches)
-                while True:
-                    matched = check_match(updated_positions)
-                    if matched:
-                        remove_matches(matched)
-                        updated_positions = animate_falling()  # Get new updated positions
-                    else:
-                        break
-            else:
-                # Swap back if no match is found
-                animate_swap(selected, (row, col))  # Reverse the swap if no match is made
+            moves.append([selected, (row, col)])
+            play_move(selected, (row, col))
         selected = None
     else:
         selected = (row, col)
@@ -391,9 +463,12 @@ def main():
         screen.fill(BACKGROUND_COLOR)
         draw_grid()
         draw_score()
+        audio.flush()
         pygame.display.flip()
         clock.tick(60)
 
+    save_replay('last_replay.json')
+    audio.close()
     pygame.quit()
 
 
@@ -0,0 +1,184 @@
+"""Offscreen replay renderer for Candy_Crush.py.
+
+Replays a recorded seed and move list (see ``save_replay``) with the game's own
+drawing and animation code, but without a window or frame delays, and exports
+every frame as fast as it can be drawn:
+
+    python Candy_Crush_Replay.py last_replay.json --out frames/ --jobs 4
+    python Candy_Crush_Replay.py last_replay.json --pipe | ffmpeg -f rawvideo -pix_fmt rgb24 -s 600x900 -r 60 -i - replay.mp4
+
+With ``--jobs`` the move list is split into segments that are rendered in
+separate processes; segment k writes ``kkk_nnnnnn.png``, so the files sort into
+playback order. The board, score and RNG state at each segment start are found
+by one pass over the moves with drawing switched off, so no worker redraws the
+segments before its own.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from multiprocessing import Pool
+
+# Render without a visible window or audio device
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+# SDL otherwise turns SIGTERM into a quit event, and Pool.terminate() never returns
+os.environ.setdefault('SDL_NO_SIGNAL_HANDLERS', '1')
+# Keep pygame's import banner out of raw frames written to stdout
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+
+def load_game():
+    """Import the game module (which opens its screen on import) in this process."""
+    import Candy_Crush
+    return Candy_Crush
+
+
+class FrameWriter:
+    """frame_sink that keeps one frame in every ``skip + 1`` and writes it out."""
+
+    def __init__(self, out_dir=None, stream=None, skip=0, prefix=''):
+        self.out_dir = out_dir
+        self.stream = stream
+        self.skip = skip
+        self.prefix = prefix
+        self.seen = 0
+        self.written = 0
+
+    def __call__(self, surface):
+        self.seen += 1
+        if (self.seen - 1) % (self.skip + 1):
+            return
+
+        import pygame
+        if self.stream is not None:
+            to_bytes = getattr(pygame.image, 'tobytes', None) or pygame.image.tostring
+            self.stream.write(to_bytes(surface, 'RGB'))
+        else:
+            pygame.image.save(surface, os.path.join(self.out_dir, f'{self.prefix}{self.written:06d}.png'))
+        self.written += 1
+
+
+def render_still(game):
+    """Emit the idle board between moves."""
+    game.screen.fill(game.BACKGROUND_COLOR)
+    game.draw_grid()
+    game.draw_score()
+    game.present_frame(0)
+
+
+def initial_state(seed):
+    """Board, score and RNG state at the start of a recording."""
+    game = load_game()
+    random.seed(seed)
+    return game.new_grid(), 0, random.getstate()
+
+
+def get_state(game):
+    """Snapshot the game's board, score and RNG state."""
+    return [row[:] for row in game.grid], game.score, random.getstate()
+
+
+def set_state(game, state):
+    """Restore a snapshot taken by ``get_state`` or ``initial_state``."""
+    grid, score, rng_state = state
+    game.grid = [row[:] for row in grid]
+    game.score = score
+    random.setstate(rng_state)
+
+
+def segment_states(seed, moves, starts):
+    """Play the moves without drawing and return the state at each start index."""
+    game = load_game()
+    set_state(game, initial_state(seed))
+    states = []
+    played = 0
+    game.render_frames = False
+    try:
+        for start in starts:
+            for candy1, candy2 in moves[played:start]:
+                game.play_move(tuple(candy1), tuple(candy2))
+            played = max(played, start)
+            states.append(get_state(game))
+    finally:
+        game.render_frames = True
+    return states
+
+
+def replay(state, moves, sink, final=True):
+    """Replay ``moves`` from ``state``, sending frames to ``sink``.
+
+    A still of the idle board is emitted before each move, and after the last
+    one when ``final`` is set.
+    """
+    game = load_game()
+    set_state(game, state)
+    game.frame_sink = sink
+
+    for candy1, candy2 in moves:
+        render_still(game)
+        game.play_move(tuple(candy1), tuple(candy2))
+
+    if final:
+        render_still(game)
+    return sink
+
+
+def render_segment(state, moves, out_dir, skip, prefix, final):
+    """Worker entry point: render one segment to a numbered image sequence."""
+    return replay(state, moves, FrameWriter(out_dir=out_dir, skip=skip, prefix=prefix), final).written
+
+
+def at_least(minimum):
+    """argparse type for integers no smaller than ``minimum``."""
+    def parse(value):
+        number = int(value)
+        if number < minimum:
+            raise argparse.ArgumentTypeError(f"must be at least {minimum}, got {number}")
+        return number
+    return parse
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a recorded Candy Crush game offscreen.")
+    parser.add_argument('replay', help="JSON file with 'seed' and 'moves', as written by save_replay")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument('--out', help="directory for a numbered PNG sequence")
+    output.add_argument('--pipe', action='store_true', help="write raw RGB24 frames to stdout")
+    parser.add_argument('--skip', type=at_least(0), default=0,
+                        help="drop N frames after every frame kept; with --jobs the pattern restarts at "
+                             "the first frame of each segment")
+    parser.add_argument('--jobs', type=at_least(1), default=1, help="render segments in N processes (--out only)")
+    args = parser.parse_args()
+
+    if args.pipe and args.jobs > 1:
+        parser.error("--jobs needs --out, frames on a pipe must be written in order")
+
+    with open(args.replay) as f:
+        recording = json.load(f)
+    seed, moves = recording['seed'], recording['moves']
+
+    if args.pipe:
+        sink = replay(initial_state(seed), moves, FrameWriter(stream=sys.stdout.buffer, skip=args.skip))
+        sys.stdout.buffer.flush()
+        print(f"{sink.written} frames", file=sys.stderr)
+        return
+
+    os.makedirs(args.out, exist_ok=True)
+    jobs = max(1, min(args.jobs, len(moves)))
+    bounds = [len(moves) * k // jobs for k in range(jobs + 1)]
+    if jobs == 1:
+        written = [render_segment(initial_state(seed), moves, args.out, args.skip, '000_', True)]
+    else:
+        with Pool(jobs) as pool:
+            # The game module is only ever imported in workers, never in this process
+            states = pool.apply(segment_states, (seed, moves, bounds[:-1]))
+            segments = [(states[k], moves[bounds[k]:bounds[k + 1]], args.out, args.skip, f'{k:03d}_', k == jobs - 1)
+                        for k in range(jobs)]
+            written = pool.starmap(render_segment, segments)
+    print(f"{sum(written)} frames written to {args.out}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+from collections import deque
 from random import choice
 
 
@@ -19,6 +20,11 @@ class Grid:
         self.height = height
         self.candy_types = candy_types
         self.grid = [[None for _ in range(width)] for _ in range(height)]
+        # Rows and columns changed since the last match scan
+        self.dirty_rows = set()
+        self.dirty_cols = set()
+        # Bumped whenever a column changes, so snapshots can reuse unchanged columns
+        self.column_versions = [0] * width
         self.populate_grid()
 
     def populate_grid(self):
@@ -32,6 +38,7 @@ class Grid:
         if self.is_in_bounds(x, y):
             self.grid[y][x] = candy
             candy.move((x, y))
+            self.mark_dirty(x, y)
 
     def swap_candies(self, pos1, pos2):
         """Swap candies between two positions."""
@@ -41,24 +48,49 @@ class Grid:
             self.grid[y1][x1], self.grid[y2][x2] = self.grid[y2][x2], self.grid[y1][x1]
             self.grid[y1][x1].move((x1, y1))
             self.grid[y2][x2].move((x2, y2))
+            self.mark_dirty(x1, y1)
+            self.mark_dirty(x2, y2)
+
+    def mark_dirty(self, x, y):
+        """Flag the row and column through (x, y) for the next match scan."""
+        self.dirty_rows.add(y)
+        self.dirty_cols.add(x)
+        self.column_versions[x] += 1
+
+    def mark_all_dirty(self):
+        """Flag the whole grid, e.g. after editing self.grid directly.
+
+        This also invalidates every column for ``History`` snapshots.
+        """
+        self.dirty_rows.update(range(self.height))
+        self.dirty_cols.update(range(self.width))
+        for x in range(self.width):
+            self.column_versions[x] += 1
 
     def is_in_bounds(self, x, y):
         """Check if the position is within the grid."""
         return 0 <= x < self.width and 0 <= y < self.height
 
     def remove_matches(self):
-        """Find and remove matches of three or more candies in a row or column."""
+        """Find and remove matches of three or more candies in a row or column.
+
+        Only rows and columns touched since the previous scan are checked: a new
+        match must contain a changed cell, and every other line was already
+        match-free (or already reported) when it was last scanned.
+        """
         matched_positions = set()
+        dirty_rows, self.dirty_rows = self.dirty_rows, set()
+        dirty_cols, self.dirty_cols = self.dirty_cols, set()
 
         # Horizontal matches
-        for y in range(self.height):
+        for y in dirty_rows:
             for x in range(self.width - 2):
                 if (self.grid[y][x] and self.grid[y][x + 1] and self.grid[y][x + 2] and
                         self.grid[y][x].candy_type == self.grid[y][x + 1].candy_type == self.grid[y][x + 2].candy_type):
                     matched_positions.update([(x, y), (x + 1, y), (x + 2, y)])
 
         # Vertical matches
-        for x in range(self.width):
+        for x in dirty_cols:
             for y in range(self.height - 2):
                 if (self.grid[y][x] and self.grid[y + 1][x] and self.grid[y + 2][x] and
                         self.grid[y][x].candy_type == self.grid[y + 1][x].candy_type == self.grid[y + 2][x].candy_type):
@@ -68,11 +100,13 @@ class Grid:
         if matched_positions:
             for x, y in matched_positions:
                 self.grid[y][x] = None  # Remove the candy
+                self.column_versions[x] += 1
 
         return matched_positions
 
     def drop_candies(self):
-        """Make candies fall down if there are empty spaces."""
+        """Make candies fall down if there are empty spaces, returning the (from, to) moves."""
+        moves = []
         for x in range(self.width):
             for y in range(self.height - 1, 0, -1):
                 if self.grid[y][x] is None:
@@ -80,14 +114,66 @@ class Grid:
                     for upper_y in range(y - 1, -1, -1):
                         if self.grid[upper_y][x]:
                             self.grid[y][x], self.grid[upper_y][x] = self.grid[upper_y][x], None
+                            self.grid[y][x].move((x, y))
+                            self.mark_dirty(x, y)
+                            moves.append(((x, upper_y), (x, y)))
                             break
+        return moves
 
     def refill_grid(self):
-        """Refill the grid with new candies after matches are cleared."""
+        """Refill the grid with new candies after matches are cleared, returning (position, candy) pairs."""
+        new_candies = []
         for y in range(self.height):
             for x in range(self.width):
                 if self.grid[y][x] is None:
-                    self.add_candy(Candy(choice(self.candy_types), (x, y)), x, y)
+                    candy = Candy(choice(self.candy_types), (x, y))
+                    self.add_candy(candy, x, y)
+                    new_candies.append(((x, y), candy))
+        return new_candies
+
+    def has_match_at(self, x, y):
+        """Check whether the candy at (x, y) is part of a run of three or more."""
+        candy = self.grid[y][x]
+        if candy is None:
+            return False
+        for dx, dy in ((1, 0), (0, 1)):
+            length = 1
+            for sign in (1, -1):
+                nx, ny = x + sign * dx, y + sign * dy
+                while (self.is_in_bounds(nx, ny) and self.grid[ny][nx] and
+                       self.grid[ny][nx].candy_type == candy.candy_type):
+                    length += 1
+                    nx, ny = nx + sign * dx, ny + sign * dy
+            if length >= 3:
+                return True
+        return False
+
+    def swap_makes_match(self, pos1, pos2):
+        """Check whether swapping two cells would create a match, leaving the grid unchanged."""
+        (x1, y1), (x2, y2) = pos1, pos2
+        self.grid[y1][x1], self.grid[y2][x2] = self.grid[y2][x2], self.grid[y1][x1]
+        try:
+            return self.has_match_at(x1, y1) or self.has_match_at(x2, y2)
+        finally:
+            self.grid[y1][x1], self.grid[y2][x2] = self.grid[y2][x2], self.grid[y1][x1]
+
+    def has_possible_moves(self):
+        """Check if any adjacent swap would create a match."""
+        for y in range(self.height):
+            for x in range(self.width):
+                for pos2 in ((x + 1, y), (x, y + 1)):
+                    if self.is_in_bounds(*pos2) and self.swap_makes_match((x, y), pos2):
+                        return True
+        return False
+
+    def load_column(self, x, candy_types):
+        """Replace column x with new candies of the given types (None leaves the cell empty)."""
+        for y, candy_type in enumerate(candy_types):
+            if candy_type is None:
+                self.grid[y][x] = None
+            else:
+                self.add_candy(Candy(candy_type, (x, y)), x, y)
+        self.column_versions[x] += 1
 
     def process_turn(self):
         """Process a turn in the game: remove matches, drop candies, refill the grid."""
@@ -99,27 +185,142 @@ class Grid:
         return None
 
 
+class BoardState:
+    """Immutable snapshot of a grid's candy types, stored as one tuple per column.
+
+    States share the column tuples they have in common, so keeping many of them
+    only costs the columns that actually differ.
+    """
+
+    __slots__ = ('columns',)
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def candy_type_at(self, x, y):
+        """Candy type at (x, y), or None if the cell is empty."""
+        return self.columns[x][y]
+
+    def swap(self, pos1, pos2):
+        """Return a new state with two cells swapped, sharing all other columns."""
+        (x1, y1), (x2, y2) = pos1, pos2
+        columns = list(self.columns)
+        column1 = list(columns[x1])
+        column2 = column1 if x1 == x2 else list(columns[x2])
+        column1[y1], column2[y2] = self.columns[x2][y2], self.columns[x1][y1]
+        columns[x1] = tuple(column1)
+        columns[x2] = tuple(column2)
+        return BoardState(tuple(columns))
+
+
+class History:
+    """Undo/redo stack of ``BoardState`` snapshots for a ``Grid``.
+
+    Snapshots are built from the grid's column versions, so a commit only copies
+    the columns that changed since the previous one and restoring a state only
+    rewrites the columns that differ from what the grid currently shows.
+    """
+
+    def __init__(self, grid, limit=None):
+        self.grid = grid
+        self.limit = limit
+        self.undo_stack = deque(maxlen=limit)  # Oldest states drop off once full
+        self.redo_stack = []
+        self._columns = [None] * grid.width
+        self._versions = [None] * grid.width
+        self.current = self.snapshot()
+
+    def snapshot(self):
+        """Return the grid's current state without recording it."""
+        for x in range(self.grid.width):
+            if self._versions[x] != self.grid.column_versions[x]:
+                self._columns[x] = tuple(row[x].candy_type if row[x] else None for row in self.grid.grid)
+                self._versions[x] = self.grid.column_versions[x]
+        return BoardState(tuple(self._columns))
+
+    def commit(self):
+        """Record the grid's current state as a new step, discarding the redo stack."""
+        self.undo_stack.append(self.current)
+        self.redo_stack.clear()
+        self.current = self.snapshot()
+        return self.current
+
+    def checkout(self, state):
+        """Load a state into the grid without touching the undo/redo stacks.
+
+        Used for lookahead: take ``current``, play speculative moves on the grid,
+        then check the original state back out.
+        """
+        self.snapshot()
+        for x, column in enumerate(state.columns):
+            if column is not self._columns[x]:
+                self.grid.load_column(x, column)
+                self._columns[x] = column
+                self._versions[x] = self.grid.column_versions[x]
+        self.current = state
+
+    def undo(self):
+        """Step back one state. Returns False if there is nothing to undo."""
+        if not self.undo_stack:
+            return False
+        self.redo_stack.append(self.current)
+        self.checkout(self.undo_stack.pop())
+        return True
+
+    def redo(self):
+        """Step forward one undone state. Returns False if there is nothing to redo."""
+        if not self.redo_stack:
+            return False
+        self.undo_stack.append(self.current)
+        self.checkout(self.redo_stack.pop())
+        return True
+
+
 class LogicEngine:
     """Handles game logic and interaction between Kivy and the core game mechanics."""
 
-    def __init__(self, grid):
+    def __init__(self, grid, history=None):
         self.grid = grid
+        self.history = history
 
     def swap_candies(self, pos1, pos2):
         """Handle the swapping of two candies and process the result."""
         self.grid.swap_candies(pos1, pos2)
 
-        # After the swap, check for matches and return the required result
-        matches = self.grid.process_turn()
+        # After the swap, resolve the whole cascade and record what moved in each step
+        steps = []
+        matches = self.grid.remove_matches()
+        while matches:
+            steps.append({
+                'matches': matches,  # Positions cleared in this step
+                'drops': self.grid.drop_candies(),  # (from, to) moves of falling candies
+                'refills': self.grid.refill_grid()  # (position, candy) of new candies
+            })
+            matches = self.grid.remove_matches()
+        if self.history:
+            self.history.commit()
 
         # If matches were found, we should trigger an animation or update
-        if matches:
+        if steps:
             return {
                 'grid': self.grid,  # The updated grid state
-                'matches': matches,  # Positions where matches occurred
+                'matches': set().union(*(step['matches'] for step in steps)),  # Positions where matches occurred
+                'steps': steps,  # One entry per cascade step, for animating them in order
                 'action': 'update'  # Command to trigger Kivy to update the visuals
             }
         return {
             'grid': self.grid,
             'action': 'no_match'  # No match found, return the grid as-is
         }
+
+    def undo(self):
+        """Restore the grid to the state before the last swap."""
+        if self.history and self.history.undo():
+            return {'grid': self.grid, 'action': 'restore'}  # Redraw without scoring
+        return {'grid': self.grid, 'action': 'no_history'}
+
+    def redo(self):
+        """Re-apply the last undone swap."""
+        if self.history and self.history.redo():
+            return {'grid': self.grid, 'action': 'restore'}  # Redraw without scoring
+        return {'grid': self.grid, 'action': 'no_history'}
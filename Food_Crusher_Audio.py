@@ -0,0 +1,86 @@
+"""Coalescing sound-effect mixer shared by the pygame and Kivy front ends.
+
+Game code posts sound events with ``AudioMixer.post``. ``flush`` is called once
+per frame and merges everything posted since the last frame into at most one cue
+per sound, using the variant for the deepest cascade step. Cues are played from a
+worker thread, so the render loop never waits on the audio backend.
+
+The worker thread suits pygame, whose mixer is thread-safe. Kivy sounds must be
+started on the Kivy thread: ``Sound.play()`` sets Kivy properties, and on Android
+it makes pyjnius calls from a thread that is never detached from the JVM, which
+crashes when the thread exits. Kivy front ends pass ``threaded=False`` and call
+``flush`` from a Clock callback, so cues start on the Kivy thread.
+"""
+import queue
+import threading
+
+
+class ChannelPool:
+    """Fixed set of channels handed out round-robin, preferring idle ones."""
+
+    def __init__(self, channels, is_busy):
+        self.channels = channels
+        self.is_busy = is_busy
+        self.index = 0
+
+    def next(self):
+        """Return an idle channel, or the least recently used one if all are busy."""
+        for _ in range(len(self.channels)):
+            channel = self.channels[self.index]
+            self.index = (self.index + 1) % len(self.channels)
+            if not self.is_busy(channel):
+                return channel
+        channel = self.channels[self.index]
+        self.index = (self.index + 1) % len(self.channels)
+        return channel
+
+
+class AudioMixer:
+    """Collects sound events per frame and plays one cue per sound, by default off the render loop.
+
+    ``cues`` maps a sound name to its pre-decoded variants, one per cascade depth;
+    ``play(variant)`` starts a variant on the backend's channel pool. With
+    ``threaded=False`` cues are started directly by ``flush`` on the caller's thread.
+    """
+
+    def __init__(self, cues, play, threaded=True):
+        self.cues = cues
+        self.play = play
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        if threaded:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def post(self, name, depth=0):
+        """Request a sound for this frame; repeated requests are merged."""
+        with self.lock:
+            self.pending[name] = max(depth, self.pending.get(name, depth))
+
+    def flush(self):
+        """End the frame: start one cue per sound posted since the last flush."""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        for name, depth in pending.items():
+            variants = self.cues.get(name)
+            if variants:
+                variant = variants[min(depth, len(variants) - 1)]
+                if self.thread is None:
+                    self.play(variant)
+                else:
+                    self.queue.put(variant)
+
+    def close(self):
+        """Stop the playback thread once queued cues have been started."""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+
+    def _run(self):
+        while True:
+            variant = self.queue.get()
+            if variant is None:
+                return
+            self.play(variant)
@@ -0,0 +1,184 @@
+"""Bitboard engine for the 8x8 board.
+
+Each candy type is stored as a 64-bit mask with bit ``y * 8 + x`` set where a
+candy of that type sits, so a board is a ``uint64`` array of shape
+``(..., n_types)``. Every module-level function accepts any number of leading
+batch dimensions and works on all boards at once with shifts and ANDs.
+
+The rules are exactly those of ``Grid`` in Food_Crusher_Android.py: runs of
+three or more in a row or column are removed, candies fall towards larger
+``y`` and empty cells are refilled in row-major order.
+"""
+from random import choice
+
+import numpy as np
+
+from Food_Crusher_Android import Candy
+
+WIDTH, HEIGHT = 8, 8
+
+ONE = np.uint64(1)
+TWO = np.uint64(2)
+ROW = np.uint64(WIDTH)
+TWO_ROWS = np.uint64(2 * WIDTH)
+
+BIT = np.array([1 << i for i in range(WIDTH * HEIGHT)], dtype=np.uint64)
+# Cells where a horizontal run of three can start without wrapping to the next row
+H3_START = np.uint64(sum(1 << (y * WIDTH + x) for y in range(HEIGHT) for x in range(WIDTH - 2)))
+
+# Every adjacent swap as ((x1, y1), (x2, y2)), horizontal swaps first
+SWAPS = ([((x, y), (x + 1, y)) for y in range(HEIGHT) for x in range(WIDTH - 1)] +
+         [((x, y), (x, y + 1)) for y in range(HEIGHT - 1) for x in range(WIDTH)])
+
+
+def bit_index(x, y):
+    """Bit holding the cell at position (x, y)."""
+    return y * WIDTH + x
+
+
+def occupied(masks):
+    """Mask of all non-empty cells."""
+    return np.bitwise_or.reduce(masks, axis=-1)
+
+
+def match_mask(masks):
+    """Mask of every cell that is part of a run of three or more."""
+    h = masks & (masks >> ONE) & (masks >> TWO) & H3_START
+    v = masks & (masks >> ROW) & (masks >> TWO_ROWS)
+    runs = h | (h << ONE) | (h << TWO) | v | (v << ROW) | (v << TWO_ROWS)
+    return np.bitwise_or.reduce(runs, axis=-1)
+
+
+def remove_matches(masks):
+    """Clear all matched cells, returning the new masks and the matched mask."""
+    matched = match_mask(masks)
+    return masks & ~matched[..., None], matched
+
+
+def drop_candies(masks):
+    """Let every candy fall until it rests on another candy or the bottom row."""
+    for _ in range(HEIGHT - 1):
+        # A cell falls one row when the cell below it is empty
+        falling = ~occupied(masks) >> ROW
+        moving = masks & falling[..., None]
+        if not moving.any():
+            break
+        masks = (masks ^ moving) | (moving << ROW)
+    return masks
+
+
+def refill(masks, rng):
+    """Fill empty cells with random candies drawn from a NumPy Generator."""
+    empty = ~occupied(masks)
+    n_types = masks.shape[-1]
+    draws = rng.integers(0, n_types, size=masks.shape[:-1] + (WIDTH * HEIGHT,))
+    filled = np.stack([np.where(draws == t, BIT, 0).sum(axis=-1, dtype=np.uint64) for t in range(n_types)],
+                      axis=-1)
+    return masks | (filled & empty[..., None])
+
+
+def swap(masks, pos1, pos2):
+    """Swap the contents of two cells."""
+    i1, i2 = np.uint64(bit_index(*pos1)), np.uint64(bit_index(*pos2))
+    diff = ((masks >> i1) ^ (masks >> i2)) & ONE
+    return masks ^ ((diff << i1) | (diff << i2))
+
+
+def legal_moves(masks):
+    """Boolean array of shape (..., len(SWAPS)): True where the swap makes a match."""
+    return np.stack([match_mask(swap(masks, pos1, pos2)) != 0 for pos1, pos2 in SWAPS], axis=-1)
+
+
+def positions(mask):
+    """Set of (x, y) positions whose bit is set in a single mask."""
+    mask = int(mask)
+    return {(i % WIDTH, i // WIDTH) for i in range(WIDTH * HEIGHT) if mask >> i & 1}
+
+
+class BitboardGrid:
+    """Drop-in replacement for ``Grid`` on an 8x8 board, usable with ``LogicEngine``."""
+
+    def __init__(self, candy_types, masks=None):
+        self.width = WIDTH
+        self.height = HEIGHT
+        self.candy_types = candy_types
+        if masks is None:
+            self.masks = np.zeros(len(candy_types), dtype=np.uint64)
+            self.refill_grid()
+        else:
+            self.masks = np.asarray(masks, dtype=np.uint64)
+
+    @classmethod
+    def from_grid(cls, grid):
+        """Build a bitboard from a ``Grid`` with the same candy types."""
+        if grid.width != WIDTH or grid.height != HEIGHT:
+            raise ValueError(f"Bitboards hold {WIDTH}x{HEIGHT} grids, got {grid.width}x{grid.height}")
+        masks = np.zeros(len(grid.candy_types), dtype=np.uint64)
+        for y, row in enumerate(grid.grid):
+            for x, candy in enumerate(row):
+                if candy:
+                    masks[grid.candy_types.index(candy.candy_type)] |= BIT[bit_index(x, y)]
+        return cls(grid.candy_types, masks)
+
+    def candy_type_at(self, x, y):
+        """Candy type at (x, y), or None if the cell is empty."""
+        for t, mask in enumerate(self.masks):
+            if int(mask) >> bit_index(x, y) & 1:
+                return self.candy_types[t]
+        return None
+
+    def is_in_bounds(self, x, y):
+        """Check if the position is within the grid."""
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def swap_candies(self, pos1, pos2):
+        """Swap candies between two positions."""
+        if self.is_in_bounds(*pos1) and self.is_in_bounds(*pos2):
+            self.masks = swap(self.masks, pos1, pos2)
+
+    def remove_matches(self):
+        """Find and remove matches, returning the matched positions like ``Grid``."""
+        self.masks, matched = remove_matches(self.masks)
+        return positions(matched)
+
+    def drop_candies(self):
+        """Make candies fall down if there are empty spaces, returning (from, to) moves like ``Grid``."""
+        filled = int(occupied(self.masks))
+        moves = []
+        for x in range(WIDTH):
+            target = HEIGHT - 1
+            for y in range(HEIGHT - 1, -1, -1):
+                if filled >> bit_index(x, y) & 1:
+                    if y != target:
+                        moves.append(((x, y), (x, target)))
+                    target -= 1
+        self.masks = drop_candies(self.masks)
+        return moves
+
+    def refill_grid(self):
+        """Refill empty cells in the same order and from the same RNG as ``Grid``.
+
+        Returns (position, candy) pairs like ``Grid.refill_grid``.
+        """
+        empty = ~int(occupied(self.masks))
+        new_candies = []
+        for i in range(WIDTH * HEIGHT):
+            if empty >> i & 1:
+                candy_type = choice(range(len(self.candy_types)))
+                self.masks[candy_type] |= BIT[i]
+                position = (i % WIDTH, i // WIDTH)
+                new_candies.append((position, Candy(self.candy_types[candy_type], position)))
+        return new_candies
+
+    def process_turn(self):
+        """Process a turn in the game: remove matches, drop candies, refill the grid."""
+        matches = self.remove_matches()
+        if matches:
+            self.drop_candies()
+            self.refill_grid()
+            return matches
+        return None
+
+    def legal_moves(self):
+        """List of adjacent swaps that would produce a match."""
+        return [move for move, legal in zip(SWAPS, legal_moves(self.masks)) if legal]
@@ -1,5 +1,5 @@
+from collections import Counter
 from kivy.app import App
-from kivy.uix.gridlayout import GridLayout
 from kivy.uix.widget import Widget
 from kivy.graphics import Rectangle, Color
 from kivy.uix.boxlayout import BoxLayout
@@ -8,8 +8,10 @@ from kivy.uix.relativelayout import RelativeLayout
 from kivy.core.window import Window
 from kivy.core.audio import SoundLoader
 from kivy.core.image import Image as CoreImage
-from kivy.animation import Animation
+from kivy.clock import Clock
+from kivy.event import EventDispatcher
 from Food_Crusher_Android import Grid, Candy, LogicEngine
+from Food_Crusher_Audio import AudioMixer, ChannelPool
 
 # Phone-like screen dimensions (16:9 aspect ratio)
 PHONE_WIDTH, PHONE_HEIGHT = 720, 1280
@@ -39,37 +41,114 @@ for texture in preloaded_images.values():
     texture.min_filter = 'nearest'  # Nearest neighbor scaling for smaller sizes
 
 
+# Audio: every sound is loaded up front, once per channel that may play it.
+# Only the match sound is posted, always at depth 0, so no pitch variants are loaded.
+AUDIO_CHANNELS = 4
+
+
+def load_voices(path):
+    """Load a channel pool of copies of a sound."""
+    copies = []
+    for _ in range(AUDIO_CHANNELS):
+        sound = SoundLoader.load(path)
+        if not sound:
+            return []
+        copies.append(sound)
+    return [ChannelPool(copies, lambda sound: sound.state == 'play')]
+
+
 # Load sounds
-swap_sound = SoundLoader.load('swap_sound.wav')
-match_sound = SoundLoader.load('match_sound.wav')
+# Kivy sounds must start on the Kivy thread, so cues play from the per-frame flush
+audio = AudioMixer({'match': load_voices('match_sound.wav')}, lambda pool: pool.next().play(), threaded=False)
 
 # Ensure sounds are loaded properly
-if not swap_sound or not match_sound:
+if not audio.cues['match']:
     print("Error loading sound files!")
 
 # Global variables to track selected candies
 selected_candy = None
 
 
+def cell_pos(x, y):
+    """Widget position of the grid cell at (x, y)."""
+    return (x * CANDY_SIZE, y * CANDY_SIZE)
+
+
+class CascadeAnimator(EventDispatcher):
+    """Moves every candy of a cascade step from one Clock callback.
+
+    Start positions and offsets for all moving widgets are kept in flat lists
+    and interpolated together each frame; ``on_complete`` fires once per step.
+    """
+    __events__ = ('on_complete',)
+
+    def __init__(self, duration=0.3, **kwargs):
+        super().__init__(**kwargs)
+        self.duration = duration
+        self.widgets = []
+        self.start = []
+        self.delta = []
+        self.elapsed = 0
+        self.callback = None
+        self._event = None
+
+    def animate(self, moves, callback=None):
+        """Start a cascade step from a list of (widget, end_position) pairs."""
+        if self._event:
+            # Land the previous step before starting a new one
+            self._step(self.duration)
+        self.widgets = []
+        self.start = []
+        self.delta = []
+        for widget, end_pos in moves:
+            self.widgets.append(widget)
+            for start, end in zip(widget.pos, end_pos):
+                self.start.append(start)
+                self.delta.append(end - start)
+        self.elapsed = 0
+        self.callback = callback
+        self._event = Clock.schedule_interval(self._step, 0)
+
+    def _step(self, dt):
+        """Advance all moving widgets by one frame."""
+        self.elapsed += dt
+        t = min(self.elapsed / self.duration, 1.0)
+        for i, widget in enumerate(self.widgets):
+            widget.pos = (self.start[2 * i] + self.delta[2 * i] * t,
+                          self.start[2 * i + 1] + self.delta[2 * i + 1] * t)
+        if t >= 1.0:
+            self._event.cancel()
+            self._event = None
+            self.dispatch('on_complete')
+            return False
+
+    def on_complete(self):
+        """Run the callback of the step that just finished."""
+        callback, self.callback = self.callback, None
+        if callback:
+            callback()
+
+
 class CandyWidget(Widget):
     """Widget representing an individual candy in the game."""
 
+    rect = None  # Rectangle drawn by draw_candy, moved along with the widget
+
     def __init__(self, candy, **kwargs):
         super().__init__(**kwargs)
         self.candy = candy
+        self.size_hint = (None, None)  # Keep GameGrid from resizing the candy
         self.size = (CANDY_SIZE, CANDY_SIZE)  # Candy size adjusted for phone dimensions
         self.update_position()
 
     def update_position(self):
         """Update the widget's position based on candy's position."""
-        self.pos = (self.candy.position[0] * self.size[0], self.candy.position[1] * self.size[1])
+        self.pos = cell_pos(*self.candy.position)
 
-    def animate_position(self, new_position, callback=None):
-        """Animate the candy to a new position."""
-        anim = Animation(pos=new_position, duration=0.3)
-        if callback:
-            anim.bind(on_complete=lambda *args: callback())
-        anim.start(self)
+    def on_pos(self, instance, pos):
+        """Keep the drawn texture in step with the widget while it moves."""
+        if self.rect is not None:
+            self.rect.pos = pos
 
     def draw_candy(self):
         """Draw the candy widget on the screen using preloaded images."""
@@ -82,14 +161,16 @@ class CandyWidget(Widget):
         if candy_texture:
             with self.canvas:
                 # Draw the image texture at the widget's position
-                Rectangle(texture=candy_texture, pos=self.pos, size=self.size)
+                self.rect = Rectangle(texture=candy_texture, pos=self.pos, size=self.size)
         else:
             # If no image is found, default to drawing a solid color
             with self.canvas:
-                Rectangle(pos=self.pos, size=self.size)
+                self.rect = Rectangle(pos=self.pos, size=self.size)
 
     def on_touch_down(self, touch):
         """Handle touch events to select and swap candies."""
+        if app.grid_widget.animating:
+            return  # Ignore input until the current cascade has landed
         if self.collide_point(*touch.pos):
             global selected_candy
             if selected_candy is None:
@@ -101,21 +182,11 @@ class CandyWidget(Widget):
                 print(f"Selected second candy at {self.candy.position}")
                 if self.can_swap_with(selected_candy):
                     # Perform the swap via the LogicEngine
-                    result = app.logic_engine.swap_candies(self.candy.position, selected_candy.candy.position)
+                    pos1, pos2 = self.candy.position, selected_candy.candy.position
+                    result = app.logic_engine.swap_candies(pos1, pos2)
 
-                    if result['action'] == 'update':
-                        # Animate the swap
-                        self.animate_position(selected_candy.pos)
-                        selected_candy.animate_position(self.pos)
-
-                        # After animation, update the grid and score
-                        def update_after_animation():
-                            app.grid_widget.update_grid()
-                            if match_sound:
-                                match_sound.play()
-                            app.increase_score(len(result['matches']) * 10)  # Increase score based on matches
-
-                        self.animate_position(self.pos, update_after_animation)
+                    # Animate the swap, then each cascade step of the result
+                    app.grid_widget.play_turn(pos1, pos2, result)
                     # Reset selected candy
                     selected_candy = None
                 else:
@@ -129,15 +200,20 @@ class CandyWidget(Widget):
         return abs(x1 - x2) + abs(y1 - y2) == 1  # Must be adjacent
 
 
-class GameGrid(GridLayout):
-    """Grid widget that manages the grid of candy widgets."""
+class GameGrid(RelativeLayout):
+    """Grid widget that manages the grid of candy widgets.
+
+    Candy widgets are placed at ``cell_pos`` of their cell and only moved by the
+    animator; the layout never moves them, so drawing, touches and animations all
+    share the grid's local coordinates. ``candy_widgets`` maps each cell to the
+    widget showing it and is updated step by step as cascades are animated.
+    """
 
     def __init__(self, game_grid, **kwargs):
         super().__init__(**kwargs)
         self.game_grid = game_grid
-        self.cols = self.game_grid.width
-        self.rows = self.game_grid.height
         self.candy_widgets = {}
+        self.animating = False
 
         # Set the size of the grid to fit the screen
         self.size_hint = (None, None)
@@ -155,25 +231,51 @@ class GameGrid(GridLayout):
                     self.add_widget(candy_widget)
                     self.candy_widgets[candy.position] = candy_widget
 
-    def update_grid(self):
-        """Update all candy widgets to match the game grid."""
-        for candy_widget in self.candy_widgets.values():
-            candy_widget.update_position()
+    def play_turn(self, pos1, pos2, result):
+        """Animate a swap, then every cascade step in the LogicEngine result."""
+        self.animating = True
+        widget1, widget2 = self.candy_widgets[pos1], self.candy_widgets[pos2]
+        self.candy_widgets[pos1], self.candy_widgets[pos2] = widget2, widget1
+        steps = list(result.get('steps', []))
+        app.animator.animate([(widget1, cell_pos(*pos2)), (widget2, cell_pos(*pos1))],
+                             lambda: self.play_step(steps))
+
+    def play_step(self, steps):
+        """Clear the next step's matches, then drop and refill its candies in one animation."""
+        if not steps:
+            self.animating = False
+            if not self.check_for_possible_moves():
+                app.end_game()
+            return
+
+        step = steps.pop(0)
+        for position in step['matches']:
+            self.remove_widget(self.candy_widgets.pop(position))
+        audio.post('match')
+        app.increase_score(len(step['matches']) * 10)  # Increase score based on matches
+
+        moves = []
+        for from_pos, to_pos in step['drops']:
+            candy_widget = self.candy_widgets.pop(from_pos)
+            self.candy_widgets[to_pos] = candy_widget
+            moves.append((candy_widget, cell_pos(*to_pos)))
+
+        # New candies start stacked just outside the edge they enter from
+        new_per_column = Counter(x for (x, _), _ in step['refills'])
+        for (x, y), candy in step['refills']:
+            candy_widget = CandyWidget(candy=candy)
+            candy_widget.pos = cell_pos(x, y - new_per_column[x])
             candy_widget.draw_candy()
+            self.add_widget(candy_widget)
+            self.candy_widgets[(x, y)] = candy_widget
+            moves.append((candy_widget, cell_pos(x, y)))
 
-        if not self.check_for_possible_moves():
-            app.end_game()
+        # Chain the next step once this one has landed
+        app.animator.animate(moves, lambda: self.play_step(steps))
 
     def check_for_possible_moves(self):
         """Check if any valid moves are left on the grid."""
-        for y in range(self.game_grid.height):
-            for x in range(self.game_grid.width):
-                # Check adjacent positions for possible swaps
-                if self.game_grid.is_in_bounds(x+1, y) and self.game_grid.swap_candies((x, y), (x+1, y)):
-                    return True
-                if self.game_grid.is_in_bounds(x, y+1) and self.game_grid.swap_candies((x, y), (x, y+1)):
-                    return True
-        return False
+        return self.game_grid.has_possible_moves()
 
 
 class BorderWidget(Widget):
@@ -230,13 +332,17 @@ class FoodCrusherApp(App):
         # Initialize the LogicEngine with the game grid
         self.logic_engine = LogicEngine(self.game_grid)
 
+        # One Clock-driven animator moves all candies of a cascade step
+        self.animator = CascadeAnimator()
+
         # Set window size to phone-like resolution
         Window.size = (PHONE_WIDTH, PHONE_HEIGHT)
         return layout
 
     def on_start(self):
         """Set up any startup logic or animations."""
-        pass  # For now, nothing special on startup
+        # Play the sounds requested during each frame, one cue per sound
+        Clock.schedule_interval(lambda dt: audio.flush(), 0)
 
     def end_game(self):
         """End the game when no more moves are possible."""